@@ -1,20 +1,16 @@
+from functools import lru_cache
 from math import factorial as math_factorial
 
-class Calculator:
-    BINARY_OPS = {"plus", "minus", "times", "divide", "pow"}
-    UNARY_OPS = {"abs", "fact"}
 
+@lru_cache(maxsize=1024)
+def _fact(n):
+    """cached factorial, repeated requests for the same n are served from memory"""
+    return math_factorial(n)
+
+
+class Calculator:
     def __init__(self):
         self.history = {"STACK": [], "INDEPENDENT": []}
-        self.function_map = {
-            "plus": self.add,
-            "minus": self.subtract,
-            "times": self.multiply,
-            "divide": self.divide,
-            "pow": self.power,
-            "abs": self.absolute,
-            "fact": self.factorial
-        }
         self.stack = list()
 
     def calc(self, args, operation, is_independent=True):
@@ -28,12 +24,14 @@ class Calculator:
         op_original = operation
         operation = operation.lower()
 
-        if operation not in self.function_map:
+        entry = _OPS.get(operation)
+        if entry is None:
             return False, f"Error: unknown operation: {op_original}"
 
-        expected_num_of_args = 2 if operation in self.BINARY_OPS else 1
+        expected_num_of_args, fn = entry
 
         if not is_independent:
+            # top of the stack is the first argument (e.g. minus is top - second)
             args = self.stack[-1:-expected_num_of_args - 1:-1]
 
         if len(args) < expected_num_of_args:
@@ -46,9 +44,7 @@ class Calculator:
 
         # operation succeeded (without considering spacial errors) so pop args from the stack
         if not is_independent:
-            self.stack.pop()
-            if operation in self.BINARY_OPS:
-                self.stack.pop()
+            del self.stack[-expected_num_of_args:]
 
         if operation == "divide" and args[1] == 0:
             return False, "Error while performing operation Divide: division by 0"
@@ -56,7 +52,7 @@ class Calculator:
         if operation == "fact" and args[0] < 0:
             return False, "Error while performing operation Factorial: not supported for the negative number"
 
-        result = self.function_map.get(operation)(args)
+        result = fn(args)
         self.log_to_history(op_original, args, result, is_independent)
 
         return True, result
@@ -69,8 +65,8 @@ class Calculator:
         """
         if quantity_to_delete > len(self.stack):
             return False, f"Error: cannot remove {quantity_to_delete} from the stack. It has only {len(self.stack)} arguments"
-        for _ in range(quantity_to_delete):
-            self.stack.pop()
+        if quantity_to_delete > 0:  # stack[-0:] is the whole stack
+            del self.stack[-quantity_to_delete:]
         return True, len(self.stack)
 
     def log_to_history(self, operation, arguments, result, is_independent=False):
@@ -102,7 +98,7 @@ class Calculator:
     @staticmethod
     def add(args):
         """add two numbers together"""
-        return sum(args)
+        return args[0] + args[1]
 
     @staticmethod
     def subtract(args):
@@ -132,4 +128,16 @@ class Calculator:
     @staticmethod
     def factorial(args):
         """calculate factorial of a number"""
-        return math_factorial(args[0])
+        return _fact(args[0])
+
+
+# operation -> (number of arguments, function), built once and resolved with a single lookup in calc
+_OPS = {
+    "plus": (2, Calculator.add),
+    "minus": (2, Calculator.subtract),
+    "times": (2, Calculator.multiply),
+    "divide": (2, Calculator.divide),
+    "pow": (2, Calculator.power),
+    "abs": (1, Calculator.absolute),
+    "fact": (1, Calculator.factorial)
+}
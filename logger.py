@@ -1,16 +1,26 @@
 import os
+import atexit
+import queue
 import logging
 from logging import Logger
-from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener
+import time
 from typing import Optional
 
 # Ensure the 'logs' directory exists
 os.makedirs("logs", exist_ok=True)
 
 class RequestFormatter(logging.Formatter):
+    # the "date time." prefix only changes once a second, so it is formatted once and reused
+    _last_sec = -1
+    _last_str = ""
+
     def formatTime(self, record, datefmt=None):
-        ct = datetime.fromtimestamp(record.created)
-        return ct.strftime("%d-%m-%Y %H:%M:%S.") + f"{int(record.msecs):03d}"
+        sec = int(record.created)
+        if sec != self._last_sec:
+            self._last_str = time.strftime("%d-%m-%Y %H:%M:%S.", time.localtime(sec))
+            self._last_sec = sec
+        return f"{self._last_str}{int(record.msecs):03d}"
 
     def format(self, record):
         record.asctime = self.formatTime(record)
@@ -29,17 +39,25 @@ def setup_logger(name: str, log_file: str, level: int = logging.INFO, to_stdout:
         return logger
 
     formatter = RequestFormatter()
+    handlers = []
 
     # File handler
     file_handler = logging.FileHandler(f"logs/{log_file}", mode="a")
     file_handler.setFormatter(formatter)
-    logger.addHandler(file_handler)
+    handlers.append(file_handler)
 
     # Optional stdout handler
     if to_stdout:
         stream_handler = logging.StreamHandler()
         stream_handler.setFormatter(formatter)
-        logger.addHandler(stream_handler)
+        handlers.append(stream_handler)
+
+    # The logger only enqueues records, a listener thread formats and writes them
+    log_queue = queue.Queue(-1)
+    logger.addHandler(QueueHandler(log_queue))
+    listener = QueueListener(log_queue, *handlers)
+    listener.start()
+    atexit.register(listener.stop)  # drain the queue before logging shuts down
 
     return logger
 
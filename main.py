@@ -1,26 +1,53 @@
 from fastapi import FastAPI, Query, Request
 from pydantic import BaseModel
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse
 from calculator import Calculator
 import uvicorn
 from logger import get_logger_level, set_logger_level, independent_logger, request_logger, stack_logger
 from itertools import count
+import asyncio
+import logging
 import time
 import json
+import orjson
 
 # --- IMPORT DATABASE HELPERS ---
-from database import init_db, save_operation, get_history_from_db
+from database import init_db, save_operation, get_history_from_db, pending_writer, flush_all_pending
+
+class CalculatorResponse(ORJSONResponse):
+    """Renders with orjson, falls back to stdlib json for results beyond 64 bit (e.g. large factorials)."""
+    def render(self, content) -> bytes:
+        try:
+            return super().render(content)
+        except orjson.JSONEncodeError:
+            return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
 
 request_counter = count(1)
-app = FastAPI()
+app = FastAPI(default_response_class=CalculatorResponse)
 calculator = Calculator()
+writer_task = None
 
 
 # --- INITIALIZE DB ON STARTUP ---
 @app.on_event("startup")
-def on_startup():
-    # This will block until DBs are ready or timeout
-    init_db()
+async def on_startup():
+    global writer_task
+    # This will wait until DBs are ready or timeout
+    await init_db()
+    writer_task = asyncio.create_task(pending_writer())
+
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    # write whatever is still queued, this waits for a flush the writer is in the middle of
+    await flush_all_pending()
+    if writer_task:
+        writer_task.cancel()
+        try:
+            await writer_task
+        except asyncio.CancelledError:
+            pass
 
 
 class IndependentCalcInput(BaseModel):
@@ -39,7 +66,7 @@ async def log_requests(request: Request, call_next):
     request.state.request_number = request_number
 
     request_logger.info(
-        f"Incoming request | #{request_number} | resource: {request.url.path} | HTTP Verb {request.method}",
+        "Incoming request | #%d | resource: %s | HTTP Verb %s", request_number, request.url.path, request.method,
         extra={"request_number": request_number}
     )
 
@@ -48,7 +75,7 @@ async def log_requests(request: Request, call_next):
     if not (request.url.path == "/logs/level" and request.method == "PUT"):
         duration_ms = int((time.time() - start_time) * 1000)
         request_logger.debug(
-            f"request #{request_number} duration: {duration_ms}ms",
+            "request #%d duration: %dms", request_number, duration_ms,
             extra={"request_number": request_number}
         )
 
@@ -61,22 +88,23 @@ def health():
 
 
 @app.post("/calculator/independent/calculate")
-def independent_calculate(data: IndependentCalcInput, request: Request):
+async def independent_calculate(data: IndependentCalcInput, request: Request):
     is_success, result = calculator.calc(data.arguments, data.operation)
     (code, field) = (200, "result") if is_success else (409, "errorMessage")
 
     if is_success:
         request_number = request.state.request_number
         independent_logger.info(
-            f"Performing operation {data.operation}. Result is {result}",
-            extra={"request_number": request_number}
-        )
-        independent_logger.debug(
-            f"Performing operation: {data.operation}({','.join(map(str, data.arguments))}) = {result}",
+            "Performing operation %s. Result is %s", data.operation, result,
             extra={"request_number": request_number}
         )
+        if independent_logger.isEnabledFor(logging.DEBUG):
+            independent_logger.debug(
+                "Performing operation: %s(%s) = %s", data.operation, ','.join(map(str, data.arguments)), result,
+                extra={"request_number": request_number}
+            )
 
-        # --- SAVE TO DB ---
+        # --- SAVE TO DB (queued, written in batches by pending_writer) ---
         save_operation(
             flavor="INDEPENDENT",
             operation=data.operation,
@@ -84,9 +112,9 @@ def independent_calculate(data: IndependentCalcInput, request: Request):
             arguments=data.arguments
         )
     else:
-        independent_logger.error(f"Server encountered an error ! message: {result}")
+        independent_logger.error("Server encountered an error ! message: %s", result)
 
-    return JSONResponse(content={field: result}, status_code=code)
+    return CalculatorResponse(content={field: result}, status_code=code)
 
 
 @app.get("/calculator/stack/size")
@@ -94,9 +122,10 @@ def stack_size(request: Request):
     request_number = request.state.request_number
     size = len(calculator.stack)
 
-    stack_logger.info(f"Stack size is {size}", extra={"request_number": request_number})
-    stack_logger.debug(f"Stack content (first == top): [{', '.join(map(str, calculator.stack[::-1]))}]",
-                       extra={"request_number": request_number})
+    stack_logger.info("Stack size is %d", size, extra={"request_number": request_number})
+    if stack_logger.isEnabledFor(logging.DEBUG):
+        stack_logger.debug("Stack content (first == top): [%s]", ', '.join(map(str, reversed(calculator.stack))),
+                           extra={"request_number": request_number})
     return {"result": size}
 
 
@@ -106,17 +135,19 @@ def add_to_stack(data: StackInput, request: Request):
     calculator.stack.extend(data.arguments)
 
     stack_logger.info(
-        f"Adding total of {len(data.arguments)} argument(s) to the stack | Stack size: {len(calculator.stack)}",
-        extra={"request_number": request_number})
-    stack_logger.debug(
-        f"Adding arguments: {','.join(map(str, data.arguments))} | Stack size before {len(calculator.stack) - len(data.arguments)} | stack size after {len(calculator.stack)}",
+        "Adding total of %d argument(s) to the stack | Stack size: %d", len(data.arguments), len(calculator.stack),
         extra={"request_number": request_number})
+    if stack_logger.isEnabledFor(logging.DEBUG):
+        stack_logger.debug(
+            "Adding arguments: %s | Stack size before %d | stack size after %d", ','.join(map(str, data.arguments)),
+            len(calculator.stack) - len(data.arguments), len(calculator.stack),
+            extra={"request_number": request_number})
 
     return {"result": len(calculator.stack)}
 
 
 @app.get("/calculator/stack/operate")
-def stack_operate(request: Request, operation: str = Query(...)):
+async def stack_operate(request: Request, operation: str = Query(...)):
     is_success, result = calculator.calc(None, operation, is_independent=False)
     (code, field) = (200, "result") if is_success else (409, "errorMessage")
 
@@ -127,15 +158,16 @@ def stack_operate(request: Request, operation: str = Query(...)):
         last_calc_args = last_calc.get('arguments') if last_calc else []
 
         stack_logger.info(
-            f"Performing operation {operation}. Result is {result} | stack size: {len(calculator.stack)}",
-            extra={"request_number": request_number}
-        )
-        stack_logger.debug(
-            f"Performing operation: {operation}({','.join(map(str, last_calc_args))}) = {result}",
+            "Performing operation %s. Result is %s | stack size: %d", operation, result, len(calculator.stack),
             extra={"request_number": request_number}
         )
+        if stack_logger.isEnabledFor(logging.DEBUG):
+            stack_logger.debug(
+                "Performing operation: %s(%s) = %s", operation, ','.join(map(str, last_calc_args)), result,
+                extra={"request_number": request_number}
+            )
 
-        # --- SAVE TO DB ---
+        # --- SAVE TO DB (queued, written in batches by pending_writer) ---
         save_operation(
             flavor="STACK",
             operation=operation,
@@ -144,10 +176,10 @@ def stack_operate(request: Request, operation: str = Query(...)):
         )
     else:
         stack_logger.error(
-            f"Server encountered an error ! message: {result}",
+            "Server encountered an error ! message: %s", result,
             extra={"request_number": request_number}
         )
-    return JSONResponse(content={field: result}, status_code=code)
+    return CalculatorResponse(content={field: result}, status_code=code)
 
 
 @app.delete("/calculator/stack/arguments")
@@ -157,38 +189,40 @@ def delete_from_stack(request: Request, num_to_delete: int = Query(..., alias="c
 
     request_number = request.state.request_number
     stack_logger.info(
-        f"Removing total {num_to_delete} argument(s) from the stack | Stack size: {result}",
+        "Removing total %d argument(s) from the stack | Stack size: %s", num_to_delete, result,
         extra={"request_number": request_number}
     )
-    return JSONResponse(content={field: result}, status_code=code)
+    return CalculatorResponse(content={field: result}, status_code=code)
 
 
 @app.get("/calculator/history")
-def get_history(request: Request, flavor: str = Query(None), persistenceMethod: str = Query(None)):
+async def get_history(request: Request, flavor: str = Query(None), persistenceMethod: str = Query(None)):
     request_number = request.state.request_number
     flavor_upper = flavor.upper() if flavor else None
 
     # --- DB FETCH LOGIC (Required for this exercise) ---
     if persistenceMethod:
-        history_data = get_history_from_db(persistenceMethod, flavor_upper)
+        history_data = await get_history_from_db(persistenceMethod, flavor_upper)
         return {"result": history_data}
 
     # --- IN-MEMORY LOGIC (Fallback/Legacy) ---
     if flavor_upper == "STACK":
         history = calculator.get_history("STACK")
-        stack_logger.info(f"History: So far total {len(history)} stack actions",
+        stack_logger.info("History: So far total %d stack actions", len(history),
                           extra={"request_number": request_number})
     elif flavor_upper == "INDEPENDENT":
         history = calculator.get_history("INDEPENDENT")
-        independent_logger.info(f"History: So far total {len(history)} independent actions",
+        independent_logger.info("History: So far total %d independent actions", len(history),
                                 extra={"request_number": request_number})
     else:
-        history = calculator.get_history()
-        stack_count = len(calculator.get_history("STACK"))
-        independent_count = len(calculator.get_history("INDEPENDENT"))
-        stack_logger.info(f"History: So far total {stack_count} stack actions",
+        stack_history = calculator.get_history("STACK")
+        independent_history = calculator.get_history("INDEPENDENT")
+        stack_count = len(stack_history)
+        independent_count = len(independent_history)
+        history = stack_history + independent_history
+        stack_logger.info("History: So far total %d stack actions", stack_count,
                           extra={"request_number": request_number})
-        independent_logger.info(f"History: So far total {independent_count} independent actions",
+        independent_logger.info("History: So far total %d independent actions", independent_count,
                                 extra={"request_number": request_number})
 
     return {"result": history}
@@ -198,7 +232,7 @@ def get_history(request: Request, flavor: str = Query(None), persistenceMethod:
 def get_level(logger_name: str = Query(..., alias="logger-name")):
     level = get_logger_level(logger_name)
     if level is None:
-        return JSONResponse(content="Logger not found", status_code=400)
+        return CalculatorResponse(content="Logger not found", status_code=400)
     return level
 
 
@@ -210,11 +244,11 @@ def set_level(logger_name: str = Query(..., alias="logger-name"), logger_level:
 
     success = set_logger_level(logger_name, logger_level)
     if not success:
-        return JSONResponse(content="Invalid logger name or level", status_code=400)
+        return CalculatorResponse(content="Invalid logger name or level", status_code=400)
 
     duration_ms = int((time.time() - start_time) * 1000)
     request_logger.debug(
-        f"request #{request_number} duration: {duration_ms}ms",
+        "request #%d duration: %dms", request_number, duration_ms,
         extra={"request_number": request_number}
     )
 